@@ -0,0 +1,180 @@
+"""
+Runtime diagnostics for HBSS backends
+Event-loop lag monitor, slow-callback watchdog and sampling profiler
+
+The same file lives in hbss-backend/ and hbss-discord/backend/: each backend
+is a self-contained directory run from inside it, so change both copies together.
+"""
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+# Token required by the /debug endpoints. Unset means the endpoints are disabled.
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+LAG_CHECK_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))   # seconds
+SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_MS", "100")) / 1000
+MAX_PROFILE_SECONDS = 30
+PROFILE_SAMPLE_INTERVAL = 0.005  # 200 Hz
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+def _collapse_stack(frame) -> str:
+    """Render a frame chain root-first, joined with ';' (collapsed-stack format)"""
+    names = []
+    while frame is not None:
+        names.append(_format_frame(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and captures the stack of callbacks that block it.
+
+    A coroutine on the loop refreshes a heartbeat every LAG_CHECK_INTERVAL and
+    records how late it woke up. A daemon watchdog thread notices when the
+    heartbeat goes stale and snapshots the loop thread's stack while the
+    offending callback is still running.
+    """
+
+    def __init__(self, interval: float = LAG_CHECK_INTERVAL, threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop_thread_id: Optional[int] = None
+        self.heartbeat = time.monotonic()
+        self.samples: deque = deque(maxlen=120)
+        self.max_lag = 0.0
+        self.slow_callbacks: deque = deque(maxlen=20)
+        # (stale heartbeat, entry) of the stall being reported, completed by _measure
+        self._open_stall: Optional[tuple] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        print(f"✓ Loop monitor started (slow callback threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            stall, self._open_stall = self._open_stall, None
+            if stall and stall[0] == self.heartbeat:
+                # The loop is back: record how long it was really blocked
+                stall[1]["blocked_ms"] = round(lag * 1000, 1)
+            self.heartbeat = now
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        reported_heartbeat = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or heartbeat == reported_heartbeat:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            # Report each stall once, with the stack as it is right now;
+            # blocked_ms stays None until the loop resumes
+            reported_heartbeat = heartbeat
+            entry = {
+                "detected_at": time.time(),
+                "detected_after_ms": round(stalled * 1000, 1),
+                "blocked_ms": None,
+                "stack": traceback.format_stack(frame),
+            }
+            self.slow_callbacks.append(entry)
+            self._open_stall = (heartbeat, entry)
+            print(f"⚠ Event loop blocked for {stalled * 1000:.0f}ms+ in {_format_frame(frame)}")
+
+    def stats(self) -> Dict:
+        samples = list(self.samples)
+        return {
+            "interval_ms": self.interval * 1000,
+            "current_lag_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+            "avg_lag_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "slow_callback_threshold_ms": self.threshold * 1000,
+            "slow_callbacks": list(self.slow_callbacks),
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over all Python threads.
+
+    Samples sys._current_frames() from a background thread, so the profiled
+    code runs unmodified. Output is collapsed-stack text ("a;b;c count"),
+    which flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, seconds: float, stop: threading.Event) -> Counter:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stacks[_collapse_stack(frame)] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    async def profile(self, seconds: float) -> str:
+        """Sample for `seconds` (capped at MAX_PROFILE_SECONDS) and return collapsed stacks"""
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        async with self._lock:
+            stop = threading.Event()
+            try:
+                stacks = await asyncio.get_running_loop().run_in_executor(None, self._sample, seconds, stop)
+            finally:
+                stop.set()
+        lines: List[str] = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+loop_monitor = LoopMonitor()
+profiler = SamplingProfiler()
+
+
+def check_debug_token(token: Optional[str]) -> bool:
+    """Debug endpoints are only reachable when DEBUG_TOKEN is set and matches"""
+    if not DEBUG_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, DEBUG_TOKEN)
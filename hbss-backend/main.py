@@ -3,12 +3,16 @@ HBSS LiveChat Backend Server
 FastAPI + WebSocket for real-time post-quantum secure messaging
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
+from fastapi.responses import PlainTextResponse
+from typing import List, Dict, Optional
 import json
 from datetime import datetime
 
+from ephemeral import EphemeralLane, EPHEMERAL_TYPES
+from diagnostics import loop_monitor, profiler, check_debug_token
+
 app = FastAPI(title="HBSS LiveChat Backend")
 
 # CORS middleware
@@ -95,6 +99,7 @@ class ConnectionManager:
             print(f"Error sending personal message: {e}")
 
 manager = ConnectionManager()
+ephemeral = EphemeralLane(lambda room: manager.active_connections)
 
 # Message history (in-memory)
 message_history: List[Dict] = []
@@ -131,6 +136,25 @@ async def get_stats():
         "users_online": list(manager.user_connections.keys())
     }
 
+@app.get("/debug/loop")
+async def debug_loop(x_debug_token: Optional[str] = Header(None)):
+    """Event-loop lag statistics and recent slow-callback stacks"""
+    if not check_debug_token(x_debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return loop_monitor.stats()
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(seconds: float = 5, x_debug_token: Optional[str] = Header(None)):
+    """
+    Run the sampling profiler for `seconds` and return collapsed stacks
+    (pipe into flamegraph.pl or load in speedscope)
+    """
+    if not check_debug_token(x_debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(await profiler.profile(seconds))
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -138,7 +162,7 @@ async def websocket_endpoint(websocket: WebSocket):
     
     Message format:
     {
-        "type": "join" | "message" | "leave",
+        "type": "join" | "message" | "typing" | "presence" | "leave",
         "sender": "username",
         "message": "text content",
         "signature": {...},  # HBSS signature object
@@ -232,6 +256,14 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 print(f"📨 Message from {sender}: {message_text[:50]}...")
             
+            elif message_type in EPHEMERAL_TYPES:
+                # Typing / presence: throttled, coalesced, never added to history
+                sender = username or data.get("sender", "Anonymous")
+                event = {"sender": sender}
+                if message_type == "presence":
+                    event["status"] = data.get("status", "online")
+                ephemeral.publish("global", message_type, sender, event, origin=websocket)
+            
             elif message_type == "leave":
                 # User leaving
                 username = data.get("sender")
@@ -250,6 +282,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
 @app.on_event("startup")
 async def startup_event():
+    loop_monitor.start()
+    ephemeral.start()
     print("=" * 60)
     print("🚀 HBSS LiveChat Backend Server Starting...")
     print("=" * 60)
@@ -263,6 +297,8 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    loop_monitor.stop()
+    ephemeral.stop()
     print("\n" + "=" * 60)
     print("🛑 HBSS LiveChat Backend Server Shutting Down...")
     print("=" * 60)
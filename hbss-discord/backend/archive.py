@@ -0,0 +1,210 @@
+"""
+Tiered message retention for HBSS Discord
+
+Messages older than RETENTION_DAYS move out of SQLite into gzip NDJSON
+partition files, one per channel per UTC day:
+
+    ARCHIVE_DIR/<channel_id>/<YYYY-MM-DD>.ndjson.gz
+    ARCHIVE_DIR/<channel_id>/index.json    [{date, file, min_id, max_id, count}, ...]
+
+Soft-deleted rows are purged instead of archived. History reads that run past
+the oldest hot row fall through to the partitions via read_archived().
+"""
+
+import asyncio
+import gzip
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Message
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))          # 0 disables archiving
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "6"))
+ARCHIVE_BATCH_ROWS = 1000
+PARTITION_CACHE_SIZE = int(os.getenv("PARTITION_CACHE_SIZE", "32"))
+
+# index.json contents keyed by channel, invalidated on file mtime
+_index_cache: Dict[int, tuple] = {}
+# Decoded partitions keyed by (channel, file), invalidated on file mtime;
+# least recently used first. Records are read-only views since every caller
+# shares them
+_partition_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _channel_dir(channel_id: int) -> str:
+    return os.path.join(ARCHIVE_DIR, str(channel_id))
+
+
+def _index_path(channel_id: int) -> str:
+    return os.path.join(_channel_dir(channel_id), "index.json")
+
+
+def load_index(channel_id: int) -> List[Dict]:
+    """Partition index for a channel, oldest partition first"""
+    path = _index_path(channel_id)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    cached = _index_cache.get(channel_id)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        index = json.load(f)
+    _index_cache[channel_id] = (mtime, index)
+    return index
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _row_to_record(msg: Message) -> Dict:
+    return {
+        "id": msg.id,
+        "channel_id": msg.channel_id,
+        "user_id": msg.user_id,
+        "content": msg.content,
+        "signature": msg.signature,
+        "created_at": msg.created_at.isoformat(),
+        "edited_at": msg.edited_at.isoformat() if msg.edited_at else None,
+    }
+
+
+def read_partition(channel_id: int, filename: str) -> List[Mapping]:
+    """Records of one partition, oldest first, as read-only mappings shared with the cache"""
+    path = os.path.join(_channel_dir(channel_id), filename)
+    key = (channel_id, filename)
+    mtime = os.path.getmtime(path)
+    cached = _partition_cache.get(key)
+    if cached and cached[0] == mtime:
+        _partition_cache.move_to_end(key)
+        return cached[1]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [MappingProxyType(json.loads(line)) for line in f if line.strip()]
+    _partition_cache[key] = (mtime, records)
+    _partition_cache.move_to_end(key)
+    while len(_partition_cache) > PARTITION_CACHE_SIZE:
+        _partition_cache.popitem(last=False)
+    return records
+
+
+def _archive_partition(db: Session, channel_id: int, day: str, cutoff: datetime) -> int:
+    """Write one channel-day partition, update the index, then delete the rows"""
+    day_start = datetime.strptime(day, "%Y-%m-%d")
+    day_end = min(day_start + timedelta(days=1), cutoff)
+    rows = db.query(Message).filter(
+        Message.channel_id == channel_id,
+        Message.created_at >= day_start,
+        Message.created_at < day_end,
+        Message.is_deleted == False,  # noqa: E712
+    ).order_by(Message.id).all()
+    if not rows:
+        return 0
+
+    os.makedirs(_channel_dir(channel_id), exist_ok=True)
+    filename = f"{day}.ndjson.gz"
+    records = []
+    if os.path.exists(os.path.join(_channel_dir(channel_id), filename)):
+        # A previous run wrote this partition but died before deleting rows
+        records = list(read_partition(channel_id, filename))
+    archived_ids = {r["id"] for r in records}
+    records.extend(_row_to_record(m) for m in rows if m.id not in archived_ids)
+    records.sort(key=lambda r: r["id"])
+
+    body = "".join(json.dumps(dict(r)) + "\n" for r in records).encode("utf-8")
+    _write_atomic(os.path.join(_channel_dir(channel_id), filename), gzip.compress(body))
+
+    index = [p for p in load_index(channel_id) if p["date"] != day]
+    index.append({
+        "date": day,
+        "file": filename,
+        "min_id": records[0]["id"],
+        "max_id": records[-1]["id"],
+        "count": len(records),
+    })
+    index.sort(key=lambda p: p["min_id"])
+    _write_atomic(_index_path(channel_id), json.dumps(index, indent=1).encode("utf-8"))
+    _index_cache.pop(channel_id, None)
+
+    ids = [m.id for m in rows]
+    for i in range(0, len(ids), ARCHIVE_BATCH_ROWS):
+        db.query(Message).filter(
+            Message.id.in_(ids[i:i + ARCHIVE_BATCH_ROWS])
+        ).delete(synchronize_session=False)
+    db.commit()
+    return len(ids)
+
+
+def run_retention(retention_days: int = RETENTION_DAYS) -> Dict:
+    """Archive messages older than retention_days and purge soft-deleted rows"""
+    db = SessionLocal()
+    try:
+        purged = db.query(Message).filter(
+            Message.is_deleted == True  # noqa: E712
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        archived = 0
+        if retention_days > 0:
+            # Align to a UTC day boundary so every partition is written whole
+            cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) \
+                - timedelta(days=retention_days)
+            day = func.date(Message.created_at)
+            partitions = db.query(Message.channel_id, day).filter(
+                Message.created_at < cutoff
+            ).group_by(Message.channel_id, day).all()
+            for channel_id, partition_day in partitions:
+                archived += _archive_partition(db, channel_id, partition_day, cutoff)
+        return {"archived": archived, "purged": purged}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def read_archived(channel_id: int, before_id: Optional[int], limit: int) -> List[Mapping]:
+    """
+    Up to `limit` archived messages with id < before_id, newest first.
+    Only partitions whose id range can contain matches are decompressed.
+    Does blocking file I/O: call it from a thread, not the event loop.
+    """
+    found: List[Mapping] = []
+    for partition in reversed(load_index(channel_id)):
+        if before_id is not None and partition["min_id"] >= before_id:
+            continue
+        records = read_partition(channel_id, partition["file"])
+        for record in reversed(records):
+            if before_id is None or record["id"] < before_id:
+                found.append(record)
+                if len(found) >= limit:
+                    return found
+    return found
+
+
+async def retention_loop():
+    """Background task: run the retention job every ARCHIVE_INTERVAL_HOURS"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            result = await loop.run_in_executor(None, run_retention)
+            if result["archived"] or result["purged"]:
+                print(f"✓ Retention: archived {result['archived']}, purged {result['purged']} messages")
+        except Exception as e:
+            print(f"✗ Retention job failed: {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
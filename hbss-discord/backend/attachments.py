@@ -0,0 +1,265 @@
+"""
+Content-addressed attachment store for HBSS Discord
+
+Uploads stream straight to disk in resumable sessions
+(ATTACHMENT_DIR/uploads/<upload_id>.part). On completion the part file is
+renamed to ATTACHMENT_DIR/blobs/<sha256[:2]>/<sha256>, or discarded if that
+blob already exists. Downloads serve byte ranges from the blob with zero-copy
+sendfile when the ASGI server offers it. Sessions idle for longer than
+UPLOAD_EXPIRY_HOURS are dropped together with their part files.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response
+
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "./attachments")
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_EXPIRY_HOURS = float(os.getenv("UPLOAD_EXPIRY_HOURS", "24"))
+READ_CHUNK = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# upload_id -> (offset hashed so far, running sha256); lost on restart, then
+# completion falls back to hashing the part file once
+_hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+# Uploads with a PATCH in progress in this process
+_writing: Set[str] = set()
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(ATTACHMENT_DIR, "uploads", f"{upload_id}.part")
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(ATTACHMENT_DIR, "blobs", sha256[:2], sha256)
+
+
+def claim_upload(upload_id: str) -> bool:
+    """Mark an upload as being written; False if another request holds it"""
+    if upload_id in _writing:
+        return False
+    _writing.add(upload_id)
+    return True
+
+
+def release_upload(upload_id: str):
+    _writing.discard(upload_id)
+
+
+def start_upload(upload_id: str):
+    os.makedirs(os.path.dirname(part_path(upload_id)), exist_ok=True)
+    open(part_path(upload_id), "wb").close()
+    _hashers[upload_id] = (0, hashlib.sha256())
+
+
+def _write_block(f, block: bytes, hasher):
+    f.write(block)
+    if hasher:
+        hasher.update(block)
+
+
+async def append_chunks(upload_id: str, offset: int, limit: int, stream) -> int:
+    """
+    Append the request body stream at `offset` without buffering more than
+    READ_CHUNK bytes; file writes and hashing run in the threadpool.
+    Returns the new offset, including bytes received before a client
+    disconnect; raises ValueError past `limit` bytes.
+    """
+    state = _hashers.get(upload_id)
+    hasher = state[1] if state and state[0] == offset else None
+    written = offset
+    f = await run_in_threadpool(open, part_path(upload_id), "r+b")
+    try:
+        await run_in_threadpool(f.truncate, offset)
+        f.seek(offset)
+        block = bytearray()
+        try:
+            async for chunk in stream:
+                if offset + len(chunk) > limit:
+                    raise ValueError("Upload exceeds declared size")
+                block += chunk
+                offset += len(chunk)
+                if len(block) >= READ_CHUNK:
+                    await run_in_threadpool(_write_block, f, bytes(block), hasher)
+                    written, block = offset, bytearray()
+        except ClientDisconnect:
+            pass  # keep what arrived; the client resumes from the stored offset
+        if block:
+            await run_in_threadpool(_write_block, f, bytes(block), hasher)
+            written = offset
+    finally:
+        await run_in_threadpool(f.close)
+        if hasher:
+            _hashers[upload_id] = (written, hasher)
+        else:
+            _hashers.pop(upload_id, None)
+    return written
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def finish_upload(upload_id: str, size: int, expected_sha256: Optional[str] = None) -> str:
+    """
+    Move a complete part file into the blob store and return its sha256.
+    Raises ValueError (and drops the part) if it differs from expected_sha256.
+    """
+    state = _hashers.pop(upload_id, None)
+    if state and state[0] == size:
+        sha256 = state[1].hexdigest()
+    else:
+        sha256 = await run_in_threadpool(_hash_file, part_path(upload_id))
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        discard_upload(upload_id)
+        raise ValueError("Content does not match declared sha256")
+    target = blob_path(sha256)
+    if os.path.exists(target):
+        os.remove(part_path(upload_id))  # dedup: identical content already stored
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(part_path(upload_id), target)
+    return sha256
+
+
+def discard_upload(upload_id: str):
+    _hashers.pop(upload_id, None)
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads(max_age_hours: float = UPLOAD_EXPIRY_HOURS) -> int:
+    """
+    Drop upload sessions with no bytes received for max_age_hours, and part
+    files left without a session. Returns the number of sessions removed.
+    """
+    # Imported here: the store itself does not depend on the database
+    from database import SessionLocal
+    from models import UploadSession
+
+    cutoff = time.time() - max_age_hours * 3600
+    db = SessionLocal()
+    try:
+        known = set()
+        expired = 0
+        stale = db.query(UploadSession).filter(
+            UploadSession.created_at < datetime.utcnow() - timedelta(hours=max_age_hours)
+        ).all()
+        for session in stale:
+            try:
+                idle = os.path.getmtime(part_path(session.id)) < cutoff
+            except OSError:
+                idle = True
+            if idle and session.id not in _writing:
+                discard_upload(session.id)
+                db.delete(session)
+                expired += 1
+        db.commit()
+        known.update(upload_id for (upload_id,) in db.query(UploadSession.id).all())
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    uploads_dir = os.path.dirname(part_path("x"))
+    if os.path.isdir(uploads_dir):
+        for name in os.listdir(uploads_dir):
+            upload_id = name[:-len(".part")]
+            path = os.path.join(uploads_dir, name)
+            if name.endswith(".part") and upload_id not in known and os.path.getmtime(path) < cutoff:
+                discard_upload(upload_id)
+    return expired
+
+
+async def upload_expiry_loop():
+    """Background task: expire abandoned uploads every hour"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            expired = await loop.run_in_executor(None, expire_uploads)
+            if expired:
+                print(f"✓ Expired {expired} abandoned uploads")
+        except Exception as e:
+            print(f"✗ Upload expiry failed: {e}")
+        await asyncio.sleep(3600)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single "bytes=a-b" range as inclusive (start, end). Returns None to serve
+    the whole file; raises ValueError for an unsatisfiable range.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multi-range or malformed: ignoring Range is allowed
+    first, last = match.groups()
+    if first == "":
+        if last == "":
+            return None  # "bytes=-" is not a valid range spec
+        if int(last) == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # last < first: invalid spec, ignored (RFC 9110 14.1.1)
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class BlobResponse(Response):
+    """
+    Sends [start, end] of a file. Uses the ASGI zero-copy send extension
+    (os.sendfile under the hood) when the server supports it, otherwise reads
+    READ_CHUNK blocks in the threadpool.
+    """
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.count,
+                })
+                return
+            f.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
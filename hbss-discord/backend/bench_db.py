@@ -0,0 +1,404 @@
+"""
+Database scale benchmark for HBSS Discord
+
+Generates synthetic users, channels and messages (with HBSS-sized signatures)
+straight into a SQLite file built from models.py, then measures the queries
+behind GET /channels, GET /channels/{id}/messages and the WebSocket history.
+
+Usage:
+    python bench_db.py --messages 1000000 --db bench_chat.db --out before.json
+    python bench_db.py --db bench_chat.db --skip-generate --out after.json
+    python bench_db.py --compare before.json after.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User, Channel, Message
+
+BATCH_SIZE = 10_000
+SIGNATURE_POOL_SIZE = 256
+HBSS_REVEALS = 64           # hbssSign reveals up to 64 preimages
+PAGE_SIZES = (20, 50)
+HISTORY_DEPTHS = (0, 1_000, 10_000, 100_000)
+REPEATS = 20
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def make_signature(rng: random.Random, reveals: int = HBSS_REVEALS, n: int = 1024) -> str:
+    """JSON-encoded signature shaped like HBSS.ts hbssSign() output"""
+    indices = rng.sample(range(n), reveals)
+    return json.dumps({
+        "digest": rng.randbytes(64).hex(),
+        "revealedPreimages": [rng.randbytes(64).hex() for _ in indices],
+        "indices": indices,
+    })
+
+
+def make_content(rng: random.Random) -> str:
+    # Mostly short chat lines with a long tail of pasted paragraphs
+    length = min(int(rng.lognormvariate(3.8, 0.9)), 4000)
+    return rng.randbytes(length // 2 + 1).hex()[:max(length, 1)]
+
+
+def channel_weights(channels: int) -> List[float]:
+    """Zipf-ish skew: a few busy channels carry most of the traffic"""
+    return [1.0 / (rank + 1) ** 1.1 for rank in range(channels)]
+
+
+def sqlite_datetime(value: datetime) -> str:
+    # Same storage format SQLAlchemy's SQLite DateTime type writes
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def insert_sql(table):
+    """Positional INSERT for every column except the autoincrement id"""
+    columns = [c.name for c in table.columns if not c.primary_key]
+    placeholders = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", columns
+
+
+def generate(db_path: str, users: int, channels: int, messages: int, days: int,
+             signed_fraction: float, seed: int) -> Dict:
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    start_time = datetime.utcnow() - timedelta(days=days)
+
+    user_rows = [
+        {
+            "google_id": f"bench-{seed}-{i}",
+            "email": f"bench-{seed}-{i}@example.com",
+            "name": f"Bench User {i}",
+            "avatar": None,
+            "commitment_array": rng.randbytes(64).hex(),
+            "created_at": sqlite_datetime(start_time),
+            "last_login": sqlite_datetime(start_time),
+            "is_active": 1,
+        }
+        for i in range(users)
+    ]
+    _bulk_insert(conn, User.__table__, user_rows)
+    user_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM users WHERE google_id LIKE ?", (f"bench-{seed}-%",))]
+
+    channel_rows = [
+        {
+            "name": f"bench-{seed}-{i}",
+            "description": "synthetic benchmark channel",
+            "created_by": user_ids[0],
+            "created_at": sqlite_datetime(start_time),
+            "is_active": 1,
+        }
+        for i in range(channels)
+    ]
+    _bulk_insert(conn, Channel.__table__, channel_rows)
+    channel_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM channels WHERE name LIKE ?", (f"bench-{seed}-%",))]
+    weights = channel_weights(len(channel_ids))
+
+    signatures = [make_signature(rng) for _ in range(SIGNATURE_POOL_SIZE)]
+    step = timedelta(days=days) / max(messages, 1)
+    sql, columns = insert_sql(Message.__table__)
+
+    print(f"Generating {messages:,} messages into {db_path} ...")
+    inserted = 0
+    batch_rates = []
+    load_start = time.perf_counter()
+    while inserted < messages:
+        count = min(BATCH_SIZE, messages - inserted)
+        chosen_channels = rng.choices(channel_ids, weights=weights, k=count)
+        batch = []
+        for i in range(count):
+            row = {
+                "channel_id": chosen_channels[i],
+                "user_id": rng.choice(user_ids),
+                "content": make_content(rng),
+                "signature": rng.choice(signatures) if rng.random() < signed_fraction else None,
+                "created_at": sqlite_datetime(start_time + step * (inserted + i)),
+                "edited_at": None,
+                "is_deleted": 0,
+            }
+            batch.append(tuple(row.get(c) for c in columns))
+        t0 = time.perf_counter()
+        conn.executemany(sql, batch)
+        conn.commit()
+        batch_rates.append(count / (time.perf_counter() - t0))
+        inserted += count
+        if inserted % (BATCH_SIZE * 50) == 0 or inserted == messages:
+            elapsed = time.perf_counter() - load_start
+            print(f"  {inserted:>12,} rows  {inserted / elapsed:>10,.0f} rows/s")
+
+    total = time.perf_counter() - load_start
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("ANALYZE")
+    conn.close()
+    return {
+        "rows": messages,
+        "seconds": round(total, 2),
+        "rows_per_sec_overall": round(messages / total),
+        "rows_per_sec_insert_median": round(statistics.median(batch_rates)),
+        "channel_ids": channel_ids,
+    }
+
+
+def _bulk_insert(conn: sqlite3.Connection, table, rows: List[Dict]):
+    sql, columns = insert_sql(table)
+    conn.executemany(sql, [tuple(row.get(c) for c in columns) for row in rows])
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Query workloads (mirror main.py)
+# ---------------------------------------------------------------------------
+
+# Deeper pages use keyset paging (id < before_id), like clients paging with
+# ?before_id=; `before_id` is None for the newest page.
+
+def q_get_channels(db, channel_id, limit, before_id):
+    return db.query(Channel).all()
+
+
+def q_get_messages(db, channel_id, limit, before_id):
+    query = db.query(Message).filter(Message.channel_id == channel_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    messages = query.order_by(Message.created_at.desc()).limit(limit).all()
+    messages.reverse()
+    return messages
+
+
+def q_ws_history(db, channel_id, limit, before_id):
+    query = db.query(Message).filter(Message.channel_id == channel_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    recent = query.order_by(Message.created_at.desc()).limit(limit).all()
+    recent.reverse()
+    return [
+        {
+            "id": msg.id,
+            "user": {
+                "id": msg.user.id,
+                "name": msg.user.name,
+                "avatar": msg.user.avatar,
+                "commitment": msg.user.commitment_array,
+            },
+            "message": msg.content,
+            "signature": json.loads(msg.signature) if msg.signature else {},
+            "timestamp": msg.created_at.isoformat(),
+        }
+        for msg in recent
+    ]
+
+
+WORKLOADS = {
+    "get_channels": q_get_channels,
+    "get_messages": q_get_messages,
+    "ws_history": q_ws_history,
+}
+
+
+def drop_os_cache(db_path: str) -> bool:
+    """Best effort: evict the DB file from the OS page cache"""
+    try:
+        fd = os.open(db_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+def percentiles(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def page_cursor(db_path: str, channel_id: int, depth: int) -> Optional[int]:
+    """before_id that starts a page `depth` messages back from the newest"""
+    if depth == 0:
+        return None
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        "SELECT id FROM messages WHERE channel_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+        (channel_id, depth - 1)).fetchone()
+    conn.close()
+    return row[0]
+
+
+def measure(db_path: str, channel_ids: List[int], repeats: int) -> Dict:
+    # Busiest and quietest channel bracket the skewed distribution
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute(
+        "SELECT channel_id, COUNT(*) FROM messages GROUP BY channel_id").fetchall())
+    conn.close()
+    candidates = [c for c in channel_ids if c in counts] or list(counts)
+    hot = max(candidates, key=counts.get)
+    cold = min(candidates, key=counts.get)
+
+    results = {}
+    for name, fn in WORKLOADS.items():
+        channel_cases = [("hot", hot), ("quiet", cold)] if name != "get_channels" else [("all", hot)]
+        depths = HISTORY_DEPTHS if name != "get_channels" else (0,)
+        sizes = PAGE_SIZES if name != "get_channels" else (0,)
+        for label, channel_id in channel_cases:
+            for depth in depths:
+                if name != "get_channels" and depth >= counts.get(channel_id, 0):
+                    continue
+                before_id = page_cursor(db_path, channel_id, depth)
+                for limit in sizes:
+                    key = f"{name}[{label},depth={depth},limit={limit}]"
+                    results[key] = _run_case(db_path, fn, channel_id, limit, before_id, repeats)
+                    r = results[key]
+                    print(f"  {key:<48} cold {r['cold_ms']:>9.2f}ms  warm p50 {r['warm']['p50_ms']:>8.2f}ms")
+    return {
+        "hot_channel_rows": counts.get(hot, 0),
+        "quiet_channel_rows": counts.get(cold, 0),
+        "cases": results,
+    }
+
+
+def _run_case(db_path, fn, channel_id, limit, before_id, repeats) -> Dict:
+    os_cache_dropped = drop_os_cache(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    t0 = time.perf_counter()
+    fn(db, channel_id, limit, before_id)
+    cold = time.perf_counter() - t0
+    db.close()
+
+    warm = []
+    for _ in range(repeats):
+        db = Session()
+        t0 = time.perf_counter()
+        fn(db, channel_id, limit, before_id)
+        warm.append(time.perf_counter() - t0)
+        db.close()
+    engine.dispose()
+    return {
+        "cold_ms": round(cold * 1000, 3),
+        "os_cache_dropped": os_cache_dropped,
+        "warm": percentiles(warm),
+    }
+
+
+def schema_fingerprint(db_path: str) -> Dict:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name").fetchall()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    ddl = "\n".join(sql for _, _, sql in rows)
+    return {
+        "sha256": hashlib.sha256(ddl.encode()).hexdigest()[:16],
+        "indexes": [name for kind, name, _ in rows if kind == "index"],
+        "page_size": page_size,
+        "page_count": page_count,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"schema {before['schema']['sha256']} -> {after['schema']['sha256']}")
+    print(f"db size {before['db_size_mb']:.1f}MB -> {after['db_size_mb']:.1f}MB")
+    print(f"{'case':<48} {'warm p50 before':>16} {'after':>10} {'delta':>8}")
+    for key, b in before["queries"]["cases"].items():
+        a = after["queries"]["cases"].get(key)
+        if not a:
+            continue
+        b50, a50 = b["warm"]["p50_ms"], a["warm"]["p50_ms"]
+        delta = (a50 - b50) / b50 * 100 if b50 else 0.0
+        print(f"{key:<48} {b50:>14.2f}ms {a50:>8.2f}ms {delta:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HBSS Discord database scale benchmark")
+    parser.add_argument("--db", default="bench_chat.db", help="SQLite file to fill and query")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="time span of generated history")
+    parser.add_argument("--signed-fraction", type=float, default=1.0,
+                        help="share of messages carrying a full HBSS signature")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--skip-generate", action="store_true", help="only run the query benchmark")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+    channel_ids = []
+    if not args.skip_generate:
+        load = generate(args.db, args.users, args.channels, args.messages, args.days,
+                        args.signed_fraction, args.seed)
+        channel_ids = load.pop("channel_ids")
+        report["insert"] = load
+    else:
+        conn = sqlite3.connect(args.db)
+        channel_ids = [row[0] for row in conn.execute("SELECT id FROM channels")]
+        conn.close()
+
+    report["db_size_mb"] = round(os.path.getsize(args.db) / 1024 / 1024, 2)
+    report["schema"] = schema_fingerprint(args.db)
+    print(f"DB size: {report['db_size_mb']:,.1f}MB  schema {report['schema']['sha256']}")
+    print("Measuring queries (cold = fresh engine + evicted OS cache, warm = repeated):")
+    report["queries"] = measure(args.db, channel_ids, args.repeats)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
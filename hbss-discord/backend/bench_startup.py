@@ -0,0 +1,121 @@
+"""
+Startup-time benchmark for HBSS Discord workers
+
+Measures, over several fresh interpreter runs:
+  - import time of main.py (wall clock, plus the slowest modules from -X importtime)
+  - ready-to-serve time: spawn uvicorn until GET /health answers 200
+
+Usage:
+    python migrations.py            # the worker refuses to start on an old schema
+    python bench_startup.py --runs 5 --out startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+READY_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> list:
+    """Top-level packages by cumulative import time (microseconds)"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         cwd=HERE, capture_output=True, text=True, check=True)
+    totals = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("   ") and not name.startswith("    "):
+            # depth-1 entries: imported directly by main
+            try:
+                totals[name.strip()] = int(cumulative)
+            except ValueError:
+                pass
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def measure_ready(env: dict) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < READY_TIMEOUT:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Worker exited: {proc.stderr.read().decode()[-500:]}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=0.5) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Worker did not become ready in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HBSS Discord startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--no-warmup", action="store_true", help="start workers with WARMUP=0")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARMUP="0" if args.no_warmup else "1")
+    imports = [measure_import() for _ in range(args.runs)]
+    ready = [measure_ready(env) for _ in range(args.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "warmup": not args.no_warmup,
+        "import": summarize(imports),
+        "ready_to_serve": summarize(ready),
+        "slowest_imports_us": slowest_imports(args.top),
+    }
+
+    print(f"import main:     median {report['import']['median_ms']:.0f}ms  (min {report['import']['min_ms']:.0f}ms)")
+    print(f"ready to serve:  median {report['ready_to_serve']['median_ms']:.0f}ms  (min {report['ready_to_serve']['min_ms']:.0f}ms)")
+    print("slowest imports:")
+    for name, micros in report["slowest_imports_us"]:
+        print(f"  {name:<24} {micros / 1000:>8.1f}ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
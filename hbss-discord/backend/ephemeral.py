@@ -0,0 +1,107 @@
+"""
+Ephemeral event lane for typing indicators and presence pings
+
+Events on this lane are never stored or replayed. They are throttled per user,
+coalesced into one batch per connection every EPHEMERAL_FLUSH_INTERVAL
+({"type": "ephemeral", "typing": [...], "presence": [...]}), and delivered
+best-effort: a connection that has not finished receiving the previous batch
+simply misses the next one, so chat messages never queue behind them.
+
+The same file lives in hbss-backend/ and hbss-discord/backend/: each backend
+is a self-contained directory run from inside it, so change both copies together.
+"""
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+EPHEMERAL_FLUSH_INTERVAL = float(os.getenv("EPHEMERAL_FLUSH_INTERVAL", "0.5"))   # seconds
+TYPING_THROTTLE = float(os.getenv("TYPING_THROTTLE", "2.0"))                      # seconds per user
+MAX_INFLIGHT_SENDS = 1000
+EPHEMERAL_TYPES = ("typing", "presence")
+
+
+class EphemeralLane:
+    def __init__(self, get_connections: Callable[[str], Iterable],
+                 interval: float = EPHEMERAL_FLUSH_INTERVAL, throttle: float = TYPING_THROTTLE):
+        self.get_connections = get_connections
+        self.interval = interval
+        self.throttle = throttle
+        # room -> {(kind, user_key): (payload, origin)}; later pings overwrite earlier ones
+        self.pending: Dict[str, Dict[Tuple[str, str], tuple]] = {}
+        self.last_accepted: Dict[Tuple[str, str, str], float] = {}
+        # Latest throttled event per (room, kind, user), sent when its window ends
+        self.deferred: Dict[Tuple[str, str, str], tuple] = {}
+        self.inflight: Set = set()
+        self.tasks: Set[asyncio.Task] = set()
+        self.dropped = 0
+        self._task = None
+
+    def publish(self, room: str, kind: str, user_key: str, payload: dict, origin=None) -> bool:
+        """
+        Queue an event from the `origin` socket, which is left out of the batch.
+        Returns False if the user is throttled: the event then replaces any
+        earlier deferred one and goes out once the throttle window has passed.
+        """
+        key = (room, kind, user_key)
+        now = time.monotonic()
+        if now - self.last_accepted.get(key, float("-inf")) < self.throttle:
+            self.deferred[key] = (payload, origin)
+            return False
+        self.last_accepted[key] = now
+        self.pending.setdefault(room, {})[(kind, user_key)] = (payload, origin)
+        return True
+
+    async def _send(self, websocket, batch: dict):
+        try:
+            await websocket.send_json(batch)
+        except Exception:
+            self.dropped += 1
+        finally:
+            self.inflight.discard(websocket)
+
+    def _release_deferred(self, now: float):
+        for key in [k for k in self.deferred if now - self.last_accepted.get(k, float("-inf")) >= self.throttle]:
+            room, kind, user_key = key
+            self.last_accepted[key] = now
+            self.pending.setdefault(room, {})[(kind, user_key)] = self.deferred.pop(key)
+
+    def flush(self):
+        self._release_deferred(time.monotonic())
+        pending, self.pending = self.pending, {}
+        for room, events in pending.items():
+            for websocket in list(self.get_connections(room)):
+                # One batch per socket per flush, all kinds together
+                batch: Dict[str, object] = {"type": "ephemeral"}
+                for (kind, _), (payload, origin) in events.items():
+                    if origin is not websocket:
+                        batch.setdefault(kind, []).append(payload)
+                if len(batch) == 1:
+                    continue
+                # Backpressure: skip sockets still draining the last batch
+                if websocket in self.inflight or len(self.inflight) >= MAX_INFLIGHT_SENDS:
+                    self.dropped += 1
+                    continue
+                self.inflight.add(websocket)
+                batch["ttl"] = self.throttle * 2
+                task = asyncio.create_task(self._send(websocket, batch))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        # Throttle entries older than the window are no longer needed
+        cutoff = time.monotonic() - self.throttle
+        for key in [k for k, t in self.last_accepted.items() if t < cutoff and k not in self.deferred]:
+            del self.last_accepted[key]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
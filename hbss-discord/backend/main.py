@@ -3,24 +3,36 @@ HBSS Discord Backend
 FastAPI + WebSocket + Google OAuth + SQLite
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Header, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
+import asyncio
 import json
-import jwt
 from datetime import datetime, timedelta
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 import os
+import uuid
 
-from database import get_db, engine
-from models import Base, User, Channel, Message
-from schemas import UserCreate, ChannelCreate, MessageCreate, UserResponse, ChannelResponse, MessageResponse
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from database import get_db
+from models import User, Channel, Message, ReadState, MerkleNode, MerkleCheckpoint, Attachment, UploadSession
+from schemas import UserCreate, ChannelCreate, MessageCreate, UserResponse, ChannelResponse, MessageResponse, ReadAck, UnreadResponse, CheckpointResponse
+from schemas import UploadCreate, UploadResponse, AttachmentResponse
+from archive import read_archived, retention_loop
+from export import iter_channel_export, gzip_stream, to_naive_utc
+from read_state import ensure_read_state, record_message, apply_ack, ack_coalescer
+from ephemeral import EphemeralLane, EPHEMERAL_TYPES
+from response_cache import response_cache, etag_matches
+from merkle import range_proof, latest_checkpoint, public_key_hex, checkpoint_loop
+from attachments import (
+    ATTACHMENT_MAX_BYTES, BlobResponse, append_chunks, blob_path, claim_upload, discard_upload,
+    finish_upload, parse_range, release_upload, start_upload, upload_expiry_loop
+)
+from migrations import ensure_schema
+from warmup import WARMUP, warm_up
+from diagnostics import loop_monitor, profiler, check_debug_token
 
 app = FastAPI(title="HBSS Discord Backend")
 
@@ -48,6 +60,8 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "your-google-client-id")
 
 security = HTTPBearer()
 
+MAX_PROOF_LEAVES = 500
+
 # WebSocket Connection Manager
 class ConnectionManager:
     def __init__(self):
@@ -90,9 +104,22 @@ class ConnectionManager:
                 self.active_connections[channel_id].remove(conn)
 
 manager = ConnectionManager()
+ephemeral = EphemeralLane(lambda channel_id: manager.active_connections.get(channel_id, []))
+
+# Google token verification: google-auth (and requests) load on first login
+_google_request = None
+
+def verify_google_credential(credential: str) -> dict:
+    global _google_request
+    from google.oauth2 import id_token
+    if _google_request is None:
+        from google.auth.transport import requests as google_requests
+        _google_request = google_requests.Request()
+    return id_token.verify_oauth2_token(credential, _google_request, GOOGLE_CLIENT_ID)
 
 # JWT Functions
 def create_access_token(data: dict):
+    import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -100,6 +127,7 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    import jwt
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -130,11 +158,7 @@ async def google_auth(token: dict, db: Session = Depends(get_db)):
     """
     try:
         # Verify Google token
-        idinfo = id_token.verify_oauth2_token(
-            token["credential"],
-            google_requests.Request(),
-            GOOGLE_CLIENT_ID
-        )
+        idinfo = verify_google_credential(token["credential"])
         
         # Extract user info
         google_id = idinfo["sub"]
@@ -165,6 +189,7 @@ async def google_auth(token: dict, db: Session = Depends(get_db)):
             if token.get("commitment"):
                 user.commitment_array = token["commitment"]
             db.commit()
+            response_cache.invalidate(f"user:{user.id}")
         
         # Create JWT token
         access_token = create_access_token({"sub": str(user.id), "email": user.email})
@@ -184,20 +209,40 @@ async def google_auth(token: dict, db: Session = Depends(get_db)):
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"Invalid Google token: {str(e)}")
 
-@app.get("/users/me")
-async def get_current_user(payload: dict = Depends(verify_token), db: Session = Depends(get_db)):
-    """Get current user info"""
+@app.get("/users/me", response_model=UserResponse)
+async def get_current_user(
+    payload: dict = Depends(verify_token),
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get current user info (ETag-cached)"""
+    user_id = int(payload["sub"])
+    
+    def build():
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserResponse.from_orm(user).model_dump(mode="json")
+    
+    return response_cache.respond(f"user:{user_id}", if_none_match, build)
+
+@app.get("/users/me/unread", response_model=List[UnreadResponse])
+async def get_unread_counts(payload: dict = Depends(verify_token), db: Session = Depends(get_db)):
+    """Unread counts and read positions for all of the user's channels"""
     user_id = int(payload["sub"])
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return UserResponse.from_orm(user)
+    return db.query(ReadState).filter(ReadState.user_id == user_id).all()
 
 @app.get("/channels", response_model=List[ChannelResponse])
-async def get_channels(db: Session = Depends(get_db), payload: dict = Depends(verify_token)):
-    """Get all channels"""
-    channels = db.query(Channel).all()
-    return channels
+async def get_channels(
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get all channels (ETag-cached, invalidated by create_channel)"""
+    def build():
+        return [ChannelResponse.model_validate(c).model_dump(mode="json") for c in db.query(Channel).all()]
+    
+    return response_cache.respond("channels", if_none_match, build)
 
 @app.post("/channels", response_model=ChannelResponse)
 async def create_channel(
@@ -221,30 +266,303 @@ async def create_channel(
     db.add(new_channel)
     db.commit()
     db.refresh(new_channel)
+    response_cache.invalidate("channels")
     return new_channel
 
 @app.get("/channels/{channel_id}/messages", response_model=List[MessageResponse])
 async def get_messages(
     channel_id: int,
     limit: int = 50,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db),
     payload: dict = Depends(verify_token)
 ):
-    """Get messages from a channel"""
-    messages = db.query(Message).filter(
-        Message.channel_id == channel_id
-    ).order_by(Message.created_at.desc()).limit(limit).all()
+    """Get messages from a channel, optionally only those older than before_id"""
+    query = db.query(Message).filter(Message.channel_id == channel_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    messages = query.order_by(Message.created_at.desc()).limit(limit).all()
+    
+    # Page runs past the hot table: continue from archived partitions
+    if len(messages) < limit:
+        oldest_id = messages[-1].id if messages else before_id
+        messages.extend(await run_in_threadpool(read_archived, channel_id, oldest_id, limit - len(messages)))
     
     # Reverse to get chronological order
     messages.reverse()
     
     return messages
 
+@app.post("/channels/{channel_id}/read", response_model=UnreadResponse)
+async def mark_read(
+    channel_id: int,
+    ack: ReadAck,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Mark messages up to and including ack.seq as read"""
+    return apply_ack(db, int(payload["sub"]), channel_id, ack.seq)
+
+@app.get("/checkpoints/public-key")
+async def get_checkpoint_public_key():
+    """Ed25519 key that signs history checkpoints ("channel_id:tree_size:root")"""
+    return {"algorithm": "Ed25519", "public_key": public_key_hex()}
+
+@app.get("/channels/{channel_id}/checkpoint", response_model=CheckpointResponse)
+async def get_checkpoint(
+    channel_id: int,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Latest signed Merkle checkpoint of the channel history"""
+    checkpoint = latest_checkpoint(db, channel_id)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="No checkpoint yet")
+    return checkpoint
+
+@app.get("/channels/{channel_id}/proof")
+async def get_inclusion_proof(
+    channel_id: int,
+    from_id: int,
+    to_id: Optional[int] = None,
+    tree_size: Optional[int] = None,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """
+    Range proof for messages from_id..to_id (one message if to_id is omitted)
+    against a checkpoint, the latest one by default.
+    """
+    if tree_size is None:
+        checkpoint = latest_checkpoint(db, channel_id)
+    else:
+        checkpoint = db.query(MerkleCheckpoint).filter(
+            MerkleCheckpoint.channel_id == channel_id,
+            MerkleCheckpoint.tree_size == tree_size
+        ).first()
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    
+    leaves = db.query(MerkleNode).filter(
+        MerkleNode.channel_id == channel_id,
+        MerkleNode.level == 0,
+        MerkleNode.message_id >= from_id,
+        MerkleNode.message_id <= (to_id if to_id is not None else from_id),
+        MerkleNode.idx < checkpoint.tree_size
+    ).order_by(MerkleNode.idx).limit(MAX_PROOF_LEAVES + 1).all()
+    if not leaves:
+        raise HTTPException(status_code=404, detail="Messages not covered by checkpoint")
+    if len(leaves) > MAX_PROOF_LEAVES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROOF_LEAVES} messages per proof")
+    
+    first, last = leaves[0].idx, leaves[-1].idx
+    proof = range_proof(db, channel_id, first, last, checkpoint.tree_size)
+    return {
+        "tree_size": checkpoint.tree_size,
+        "root": checkpoint.root,
+        "first_index": first,
+        "message_ids": [leaf.message_id for leaf in leaves],
+        "leaves": [leaf.hash for leaf in leaves],
+        "left": proof["left"],
+        "right": proof["right"]
+    }
+
+@app.get("/channels/{channel_id}/export")
+async def export_messages(
+    channel_id: int,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """
+    Stream a channel's full history as NDJSON, oldest first.
+    Resume an interrupted export with after_id=<last id received>.
+    """
+    if not db.query(Channel.id).filter(Channel.id == channel_id).first():
+        raise HTTPException(status_code=404, detail="Channel not found")
+    
+    # Normalise before streaming starts: a failure mid-body would truncate a 200
+    body = iter_channel_export(channel_id, after_id, before_id, to_naive_utc(since), to_naive_utc(until))
+    filename = f"channel-{channel_id}.ndjson" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        return StreamingResponse(gzip_stream(body), media_type="application/gzip", headers=headers)
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+def get_upload_session(db: Session, upload_id: str, user_id: int) -> UploadSession:
+    session = db.query(UploadSession).filter(
+        UploadSession.id == upload_id, UploadSession.user_id == user_id
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+@app.post("/attachments/uploads", response_model=UploadResponse)
+async def create_upload(
+    upload: UploadCreate,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Start a resumable upload; send the bytes with PATCH and an Upload-Offset header"""
+    if upload.size <= 0 or upload.size > ATTACHMENT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Size must be 1..{ATTACHMENT_MAX_BYTES} bytes")
+    if upload.signature and not upload.sha256:
+        raise HTTPException(status_code=400, detail="A signature must come with the sha256 it signs")
+    
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=int(payload["sub"]),
+        filename=upload.filename,
+        content_type=upload.content_type,
+        size=upload.size,
+        sha256=upload.sha256.lower() if upload.sha256 else None,
+        signature=upload.signature
+    )
+    start_upload(session.id)
+    db.add(session)
+    db.commit()
+    return UploadResponse(upload_id=session.id, offset=0, size=session.size)
+
+@app.get("/attachments/uploads/{upload_id}", response_model=UploadResponse)
+async def get_upload(
+    upload_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Current offset of an upload, to resume after an interruption"""
+    session = get_upload_session(db, upload_id, int(payload["sub"]))
+    response.headers["Upload-Offset"] = str(session.offset)
+    return UploadResponse(upload_id=session.id, offset=session.offset, size=session.size)
+
+@app.patch("/attachments/uploads/{upload_id}", response_model=UploadResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Append the request body at Upload-Offset; the last chunk completes the upload"""
+    session = get_upload_session(db, upload_id, int(payload["sub"]))
+    # One writer at a time, so two PATCHes can't both pass the offset check
+    if not claim_upload(session.id):
+        raise HTTPException(status_code=409, detail="Another request is writing this upload")
+    try:
+        return await _append_upload(db, session, upload_offset, request)
+    finally:
+        release_upload(session.id)
+
+async def _append_upload(db: Session, session: UploadSession, upload_offset: int, request: Request) -> UploadResponse:
+    db.refresh(session)  # the previous writer may have moved the offset
+    if upload_offset != session.offset:
+        raise HTTPException(status_code=409, detail=f"Expected Upload-Offset {session.offset}")
+    
+    try:
+        session.offset = await append_chunks(session.id, session.offset, session.size, request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    db.commit()
+    
+    if session.offset < session.size:
+        return UploadResponse(upload_id=session.id, offset=session.offset, size=session.size)
+    
+    try:
+        sha256 = await finish_upload(session.id, session.size, session.sha256)
+    except ValueError as e:
+        db.delete(session)
+        db.commit()
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    attachment = Attachment(
+        sha256=sha256,
+        filename=session.filename,
+        content_type=session.content_type,
+        size=session.size,
+        uploaded_by=session.user_id,
+        signature=session.signature
+    )
+    db.add(attachment)
+    db.delete(session)
+    db.commit()
+    return UploadResponse(upload_id=session.id, offset=attachment.size, size=attachment.size, attachment_id=attachment.id)
+
+@app.delete("/attachments/uploads/{upload_id}")
+async def cancel_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    session = get_upload_session(db, upload_id, int(payload["sub"]))
+    if not claim_upload(session.id):
+        raise HTTPException(status_code=409, detail="Another request is writing this upload")
+    try:
+        discard_upload(session.id)
+        db.delete(session)
+        db.commit()
+    finally:
+        release_upload(session.id)
+    return {"status": "cancelled"}
+
+@app.get("/attachments/{attachment_id}", response_model=AttachmentResponse)
+async def get_attachment(
+    attachment_id: int,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """Attachment metadata, including the HBSS signature over its sha256"""
+    attachment = db.query(Attachment).filter(Attachment.id == attachment_id).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return attachment
+
+@app.get("/attachments/{attachment_id}/content")
+async def download_attachment(
+    attachment_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    payload: dict = Depends(verify_token)
+):
+    """File bytes; honours single byte ranges. Content is immutable per sha256."""
+    attachment = db.query(Attachment).filter(Attachment.id == attachment_id).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    
+    etag = f'"{attachment.sha256}"'
+    filename = attachment.filename.replace('"', "")
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Content-SHA256": attachment.sha256
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        byte_range = parse_range(range_header, attachment.size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{attachment.size}"})
+    
+    start, end, status_code = 0, attachment.size - 1, 200
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{attachment.size}"
+    return BlobResponse(blob_path(attachment.sha256), start, end, status_code, headers, attachment.content_type)
+
 @app.websocket("/ws/{channel_id}")
 async def websocket_endpoint(websocket: WebSocket, channel_id: str, db: Session = Depends(get_db)):
     """
     WebSocket endpoint for real-time messaging
     """
+    import jwt
     user_id = None
     
     try:
@@ -270,31 +588,58 @@ async def websocket_endpoint(websocket: WebSocket, channel_id: str, db: Session
         
         # Connect
         await manager.connect(websocket, channel_id, user_id)
+        ensure_read_state(db, user.id, int(channel_id))
         
         # Send recent messages
         recent_messages = db.query(Message).filter(
             Message.channel_id == int(channel_id)
         ).order_by(Message.created_at.desc()).limit(20).all()
         
-        recent_messages.reverse()
+        history = [
+            {
+                "id": msg.id,
+                "user": {
+                    "id": msg.user.id,
+                    "name": msg.user.name,
+                    "avatar": msg.user.avatar,
+                    "commitment": msg.user.commitment_array
+                },
+                "message": msg.content,
+                "signature": json.loads(msg.signature) if msg.signature else {},
+                "signature_text": msg.signature,  # exact text hashed into the Merkle leaf
+                "timestamp": msg.created_at.isoformat()
+            }
+            for msg in recent_messages
+        ]
         
-        await websocket.send_json({
-            "type": "history",
-            "messages": [
-                {
-                    "id": msg.id,
+        # Quiet channel: top up from archived partitions
+        if len(history) < 20:
+            oldest_id = history[-1]["id"] if history else None
+            archived = await run_in_threadpool(read_archived, int(channel_id), oldest_id, 20 - len(history))
+            authors = {
+                u.id: u for u in db.query(User).filter(User.id.in_({r["user_id"] for r in archived}))
+            } if archived else {}
+            for record in archived:
+                author = authors.get(record["user_id"])
+                history.append({
+                    "id": record["id"],
                     "user": {
-                        "id": msg.user.id,
-                        "name": msg.user.name,
-                        "avatar": msg.user.avatar,
-                        "commitment": msg.user.commitment_array
+                        "id": record["user_id"],
+                        "name": author.name if author else "Unknown",
+                        "avatar": author.avatar if author else None,
+                        "commitment": author.commitment_array if author else None
                     },
-                    "message": msg.content,
-                    "signature": json.loads(msg.signature) if msg.signature else {},
-                    "timestamp": msg.created_at.isoformat()
-                }
-                for msg in recent_messages
-            ]
+                    "message": record["content"],
+                    "signature": json.loads(record["signature"]) if record["signature"] else {},
+                    "signature_text": record["signature"],
+                    "timestamp": record["created_at"]
+                })
+        
+        history.reverse()
+        
+        await websocket.send_json({
+            "type": "history",
+            "messages": history
         })
         
         # Listen for messages
@@ -310,6 +655,8 @@ async def websocket_endpoint(websocket: WebSocket, channel_id: str, db: Session
                     signature=json.dumps(data.get("signature", {}))
                 )
                 db.add(message)
+                db.flush()
+                record_message(db, message)
                 db.commit()
                 db.refresh(message)
                 
@@ -325,19 +672,36 @@ async def websocket_endpoint(websocket: WebSocket, channel_id: str, db: Session
                     },
                     "message": data.get("message", ""),
                     "signature": data.get("signature", {}),
+                    "signature_text": message.signature,
                     "timestamp": message.created_at.isoformat()
                 }
                 
                 await manager.broadcast(broadcast_data, channel_id, exclude=websocket)
+            
+            elif data.get("type") in EPHEMERAL_TYPES:
+                # Typing / presence: throttled, coalesced, never stored
+                event = {"user": {"id": user.id, "name": user.name}}
+                if data["type"] == "presence":
+                    event["status"] = data.get("status", "online")
+                ephemeral.publish(channel_id, data["type"], user_id, event, origin=websocket)
+            
+            elif data.get("type") == "read":
+                # Coalesced: only the highest seq per interval reaches the DB;
+                # apply_ack clamps it to the channel head
+                seq = data.get("seq")
+                if isinstance(seq, int) and not isinstance(seq, bool):
+                    ack_coalescer.ack(int(user_id), int(channel_id), seq)
     
     except WebSocketDisconnect:
         if user_id:
             manager.disconnect(websocket, channel_id, user_id)
+            await ack_coalescer.flush_user(int(user_id), int(channel_id))
     
     except Exception as e:
         print(f"WebSocket error: {e}")
         if user_id:
             manager.disconnect(websocket, channel_id, user_id)
+            await ack_coalescer.flush_user(int(user_id), int(channel_id))
 
 @app.get("/health")
 async def health_check():
@@ -347,6 +711,46 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/debug/loop")
+async def debug_loop(x_debug_token: Optional[str] = Header(None)):
+    """Event-loop lag statistics and recent slow-callback stacks"""
+    if not check_debug_token(x_debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return loop_monitor.stats()
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(seconds: float = 5, x_debug_token: Optional[str] = Header(None)):
+    """
+    Run the sampling profiler for `seconds` and return collapsed stacks
+    (pipe into flamegraph.pl or load in speedscope)
+    """
+    if not check_debug_token(x_debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(await profiler.profile(seconds))
+
+@app.on_event("startup")
+async def startup_event():
+    ensure_schema()
+    if WARMUP:
+        warm_up()
+    loop_monitor.start()
+    ack_coalescer.start()
+    ephemeral.start()
+    app.state.retention_task = asyncio.create_task(retention_loop())
+    app.state.checkpoint_task = asyncio.create_task(checkpoint_loop())
+    app.state.upload_expiry_task = asyncio.create_task(upload_expiry_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    loop_monitor.stop()
+    ack_coalescer.stop()
+    ephemeral.stop()
+    app.state.retention_task.cancel()
+    app.state.checkpoint_task.cancel()
+    app.state.upload_expiry_task.cancel()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,264 @@
+"""
+Merkle checkpoints of channel history
+
+Each channel keeps an append-only Merkle tree over its messages, built with the
+same rules as generateMerkleRoot() in HBSS.ts: hex strings are concatenated and
+hashed with SHA-512, and an unpaired last node is promoted unchanged.
+
+    leaf = sha512(content + signature)   # signature: stored JSON text, "" if none;
+                                         # sent verbatim as signature_text over WebSocket
+
+Only complete subtrees are stored (merkle_nodes), so appends touch O(1)
+amortized rows and any node of any past tree size is rebuilt from O(log n)
+lookups. A background job appends new messages and publishes an Ed25519-signed
+checkpoint (tree_size, root); a contiguous page of history is then verified
+against one checkpoint with a single range proof.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Channel, Message, MerkleNode, MerkleCheckpoint
+
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "60"))   # seconds
+CHECKPOINT_KEY_FILE = os.getenv("CHECKPOINT_KEY_FILE", "./checkpoint_signing.key")
+APPEND_BATCH_ROWS = 1000
+
+
+def sha512(data: str) -> str:
+    return hashlib.sha512(data.encode("utf-8")).hexdigest()
+
+
+def leaf_hash(content: str, signature: Optional[str]) -> str:
+    return sha512(content + (signature or ""))
+
+
+def _level_size(tree_size: int, level: int) -> int:
+    return (tree_size + (1 << level) - 1) >> level
+
+
+# ---------------------------------------------------------------------------
+# Tree storage
+# ---------------------------------------------------------------------------
+
+def _stored(db: Session, channel_id: int, level: int, idx: int) -> str:
+    node = db.get(MerkleNode, (channel_id, level, idx))
+    return node.hash
+
+
+def node_hash(db: Session, channel_id: int, level: int, idx: int, tree_size: int) -> str:
+    """Hash of node (level, idx) in the tree as it was at `tree_size` leaves"""
+    if (idx + 1) << level <= tree_size:
+        return _stored(db, channel_id, level, idx)
+    # Partial node on the right edge: rebuild from its children
+    left = node_hash(db, channel_id, level - 1, 2 * idx, tree_size)
+    if (2 * idx + 1) << (level - 1) >= tree_size:
+        return left  # no right child: promoted
+    return sha512(left + node_hash(db, channel_id, level - 1, 2 * idx + 1, tree_size))
+
+
+def tree_size(db: Session, channel_id: int) -> int:
+    count = db.query(func.max(MerkleNode.idx)).filter(
+        MerkleNode.channel_id == channel_id, MerkleNode.level == 0
+    ).scalar()
+    return 0 if count is None else count + 1
+
+
+def root_hash(db: Session, channel_id: int, size: int) -> str:
+    if size == 0:
+        return ""
+    level = 0
+    while _level_size(size, level) > 1:
+        level += 1
+    return node_hash(db, channel_id, level, 0, size)
+
+
+def append_new_messages(db: Session, channel_id: int) -> int:
+    """Append messages newer than the last leaf, in id order"""
+    size = tree_size(db, channel_id)
+    last_id = 0
+    if size:
+        last_id = db.get(MerkleNode, (channel_id, 0, size - 1)).message_id
+    appended = 0
+    while True:
+        rows = db.query(Message.id, Message.content, Message.signature).filter(
+            Message.channel_id == channel_id, Message.id > last_id
+        ).order_by(Message.id).limit(APPEND_BATCH_ROWS).all()
+        if not rows:
+            break
+        # Right-edge hashes of the current batch, so parents don't re-read them
+        recent: Dict[tuple, str] = {}
+        for row in rows:
+            h = leaf_hash(row.content, row.signature)
+            level, idx = 0, size
+            db.add(MerkleNode(channel_id=channel_id, level=0, idx=idx, hash=h, message_id=row.id))
+            recent[(0, idx)] = h
+            while idx % 2 == 1:
+                left = recent.get((level, idx - 1)) or _stored(db, channel_id, level, idx - 1)
+                h = sha512(left + h)
+                level, idx = level + 1, idx // 2
+                db.add(MerkleNode(channel_id=channel_id, level=level, idx=idx, hash=h))
+                recent[(level, idx)] = h
+            size += 1
+            last_id = row.id
+        db.flush()
+        appended += len(rows)
+    db.commit()
+    return appended
+
+
+# ---------------------------------------------------------------------------
+# Proofs
+# ---------------------------------------------------------------------------
+
+def range_proof(db: Session, channel_id: int, first: int, last: int, size: int) -> Dict:
+    """
+    Sibling hashes needed to rebuild the root from leaves[first..last].
+    left[l] / right[l] is the sibling joined at level l on that side, or None.
+    """
+    left: List[Optional[str]] = []
+    right: List[Optional[str]] = []
+    level = 0
+    while _level_size(size, level) > 1:
+        width = _level_size(size, level)
+        left.append(node_hash(db, channel_id, level, first - 1, size) if first % 2 == 1 else None)
+        right.append(node_hash(db, channel_id, level, last + 1, size)
+                     if last % 2 == 0 and last + 1 < width else None)
+        first, last, level = first // 2, last // 2, level + 1
+    return {"left": left, "right": right}
+
+
+def verify_range(leaves: List[str], first: int, size: int, proof: Dict, root: str) -> bool:
+    """Reference verifier: what a client runs against a checkpoint"""
+    nodes = list(leaves)
+    for left, right in zip(proof["left"], proof["right"]):
+        if left is not None:
+            nodes.insert(0, left)
+            first -= 1
+        if right is not None:
+            nodes.append(right)
+        # `first` is even now; pair up, an unpaired tail is promoted
+        nodes = [sha512(nodes[i] + nodes[i + 1]) if i + 1 < len(nodes) else nodes[i]
+                 for i in range(0, len(nodes), 2)]
+        first //= 2
+    return len(nodes) == 1 and nodes[0] == root
+
+
+# ---------------------------------------------------------------------------
+# Signed checkpoints
+# ---------------------------------------------------------------------------
+
+def _read_signing_key():
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    with open(CHECKPOINT_KEY_FILE, "rb") as f:
+        return Ed25519PrivateKey.from_private_bytes(bytes.fromhex(f.read().decode().strip()))
+
+
+def ensure_signing_key() -> bool:
+    """
+    Create CHECKPOINT_KEY_FILE if it is missing; returns True if it was created.
+    Run from the deploy step (python migrations.py). Safe against concurrent
+    callers: the key is written to a temp file and linked into place, so the
+    file is never seen half-written and only the first writer wins.
+    """
+    # cryptography is imported here so it stays off the worker import path
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    if os.path.exists(CHECKPOINT_KEY_FILE):
+        return False
+    raw = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    tmp = f"{CHECKPOINT_KEY_FILE}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(raw.hex())
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp, CHECKPOINT_KEY_FILE)
+    except FileExistsError:
+        return False  # another process got there first; use its key
+    finally:
+        os.remove(tmp)
+    print(f"✓ Generated checkpoint signing key at {CHECKPOINT_KEY_FILE}")
+    return True
+
+
+def _load_signing_key():
+    try:
+        return _read_signing_key()
+    except FileNotFoundError:
+        # Deploy step was skipped (e.g. local development)
+        ensure_signing_key()
+        return _read_signing_key()
+
+
+_signing_key = None
+
+
+def signing_key():
+    """Ed25519PrivateKey, loaded on first use"""
+    global _signing_key
+    if _signing_key is None:
+        _signing_key = _load_signing_key()
+    return _signing_key
+
+
+def public_key_hex() -> str:
+    from cryptography.hazmat.primitives import serialization
+    return signing_key().public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    ).hex()
+
+
+def checkpoint_message(channel_id: int, size: int, root: str) -> str:
+    return f"{channel_id}:{size}:{root}"
+
+
+def create_checkpoints() -> int:
+    """Append new messages for every channel and checkpoint those that grew"""
+    db = SessionLocal()
+    created = 0
+    try:
+        for (channel_id,) in db.query(Channel.id).all():
+            append_new_messages(db, channel_id)
+            size = tree_size(db, channel_id)
+            latest = latest_checkpoint(db, channel_id)
+            if size == 0 or (latest and latest.tree_size == size):
+                continue
+            root = root_hash(db, channel_id, size)
+            signature = signing_key().sign(checkpoint_message(channel_id, size, root).encode()).hex()
+            db.add(MerkleCheckpoint(channel_id=channel_id, tree_size=size, root=root, signature=signature))
+            db.commit()
+            created += 1
+        return created
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def latest_checkpoint(db: Session, channel_id: int) -> Optional[MerkleCheckpoint]:
+    return db.query(MerkleCheckpoint).filter(
+        MerkleCheckpoint.channel_id == channel_id
+    ).order_by(MerkleCheckpoint.tree_size.desc()).first()
+
+
+async def checkpoint_loop():
+    """Background task: publish checkpoints every CHECKPOINT_INTERVAL"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, create_checkpoints)
+        except Exception as e:
+            print(f"✗ Checkpoint job failed: {e}")
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
@@ -0,0 +1,147 @@
+"""
+Versioned schema migrations for HBSS Discord
+
+Run once per deploy, before starting workers:
+
+    python migrations.py
+
+This also creates the checkpoint signing key if it is missing, so workers
+started with --workers N only ever read it.
+
+Workers only read schema_version at startup (see ensure_schema) instead of
+running create_all on every import. Set AUTO_MIGRATE=1 to let a worker apply
+pending migrations itself, e.g. for local development.
+"""
+
+import os
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from database import SessionLocal, engine
+from models import Base, Channel, Message
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+
+DEFAULT_CHANNELS = [
+    {"name": "general", "description": "General discussion and announcements", "created_by": 1},
+    {"name": "hbss-dev", "description": "HBSS development and technical discussions", "created_by": 1},
+    {"name": "research", "description": "Post-quantum cryptography research", "created_by": 1},
+    {"name": "random", "description": "Off-topic and casual chat", "created_by": 1},
+]
+
+
+def _create_tables(bind: Engine):
+    # checkfirst: tables that already exist (pre-migration databases) are kept
+    Base.metadata.create_all(bind=bind)
+
+
+def _messages_channel_index(bind: Engine):
+    # create_all does not add indexes to tables that already existed
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_messages_channel_id_id ON messages (channel_id, id)"
+        ))
+
+
+def _seed_default_channels(bind: Engine):
+    db = SessionLocal(bind=bind)
+    try:
+        if db.query(Channel).first():
+            return
+        for channel_data in DEFAULT_CHANNELS:
+            db.add(Channel(**channel_data))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _messages_autoincrement(bind: Engine):
+    # Without AUTOINCREMENT SQLite hands out max(id) + 1, so ids of archived
+    # rows come back once the newest rows are archived. Rebuild the table.
+    with bind.begin() as conn:
+        ddl = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'messages'"
+        )).scalar()
+        if "AUTOINCREMENT" in ddl.upper():
+            return  # created by migration 1 from the current models
+        conn.execute(text("ALTER TABLE messages RENAME TO messages_old"))
+        for index in Message.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        Message.__table__.create(bind=conn)
+        columns = ", ".join(c.name for c in Message.__table__.columns)
+        conn.execute(text(f"INSERT INTO messages ({columns}) SELECT {columns} FROM messages_old"))
+        conn.execute(text("DROP TABLE messages_old"))
+        # Archived ids may be above every remaining row
+        from archive import load_index
+        last_id = conn.execute(text("SELECT MAX(id) FROM messages")).scalar() or 0
+        for (channel_id,) in conn.execute(text("SELECT id FROM channels")).all():
+            last_id = max([last_id] + [p["max_id"] for p in load_index(channel_id)])
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'messages'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('messages', :seq)"), {"seq": last_id})
+
+
+# (version, description, step) -- append only, never edit a released step
+MIGRATIONS: List[Tuple[int, str, Callable[[Engine], None]]] = [
+    (1, "create tables", _create_tables),
+    (2, "index messages (channel_id, id)", _messages_channel_index),
+    (3, "seed default channels", _seed_default_channels),
+    (4, "never reuse message ids", _messages_autoincrement),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(bind: Engine = engine) -> int:
+    with bind.connect() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        )).first()
+        if not exists:
+            return 0
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def migrate(bind: Engine = engine) -> int:
+    """Apply pending migrations in order; returns the resulting version"""
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        ))
+    version = current_version(bind)
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        step(bind)
+        with bind.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:v, :d)"),
+                {"v": number, "d": description},
+            )
+        print(f"✓ Migration {number}: {description}")
+        version = number
+    return version
+
+
+def ensure_schema(bind: Engine = engine, auto_migrate: bool = AUTO_MIGRATE):
+    """Startup check: one query when the schema is current"""
+    version = current_version(bind)
+    if version >= LATEST_VERSION:
+        return
+    if auto_migrate:
+        migrate(bind)
+        return
+    raise RuntimeError(
+        f"Database schema is at version {version}, expected {LATEST_VERSION}. "
+        "Run `python migrations.py` (or set AUTO_MIGRATE=1)."
+    )
+
+
+if __name__ == "__main__":
+    print("Migrating HBSS Discord database...")
+    version = migrate()
+    print(f"✓ Database schema at version {version}")
+    from merkle import ensure_signing_key
+    ensure_signing_key()
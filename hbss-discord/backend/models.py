@@ -2,7 +2,7 @@
 SQLAlchemy Models for HBSS Discord
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -55,3 +55,69 @@ class Message(Base):
     # Relationships
     user = relationship("User", back_populates="messages")
     channel = relationship("Channel", back_populates="messages")
+    
+    __table_args__ = (
+        Index("ix_messages_channel_id_id", "channel_id", "id"),
+        # Ids are never reused once rows move to the archive (retention)
+        {"sqlite_autoincrement": True},
+    )
+
+class ReadState(Base):
+    """Per-user read position in a channel with a maintained unread counter"""
+    __tablename__ = "read_states"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    channel_id = Column(Integer, ForeignKey("channels.id"), primary_key=True, index=True)
+    last_read_seq = Column(Integer, nullable=False, default=0)  # id of last read message
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MerkleNode(Base):
+    """
+    Complete subtree hash in a channel's history Merkle tree.
+    Level 0 holds leaves: sha512(content + signature) of each message.
+    """
+    __tablename__ = "merkle_nodes"
+    
+    channel_id = Column(Integer, ForeignKey("channels.id"), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    hash = Column(String(128), nullable=False)
+    message_id = Column(Integer, nullable=True, index=True)  # leaves only
+
+class MerkleCheckpoint(Base):
+    __tablename__ = "merkle_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    channel_id = Column(Integer, ForeignKey("channels.id"), nullable=False, index=True)
+    tree_size = Column(Integer, nullable=False)
+    root = Column(String(128), nullable=False)
+    signature = Column(String, nullable=False)  # Ed25519 over "channel_id:tree_size:root", hex
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Attachment(Base):
+    """Uploaded file; content lives in the content-addressed store under sha256"""
+    __tablename__ = "attachments"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    signature = Column(Text, nullable=True)  # HBSS signature JSON over the sha256 hex
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class UploadSession(Base):
+    """In-progress resumable upload"""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False, default=0)
+    sha256 = Column(String(64), nullable=True)  # declared by the client, checked on completion
+    signature = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,147 @@
+"""
+Read positions and materialized unread counters for HBSS Discord
+
+Each (user, channel) pair has a ReadState row holding the id of the last read
+message and a running unread_count. The counter is bumped in the message write
+path and recomputed only over the unread tail when a read ack arrives, so
+listing unread counts is a single primary-key lookup per user.
+"""
+
+import asyncio
+import os
+from typing import Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Message, ReadState
+
+ACK_FLUSH_INTERVAL = float(os.getenv("ACK_FLUSH_INTERVAL", "1.0"))  # seconds
+
+
+def ensure_read_state(db: Session, user_id: int, channel_id: int) -> ReadState:
+    """Fetch the user's read state, starting new members at the channel head"""
+    state = db.get(ReadState, (user_id, channel_id))
+    if state is None:
+        head = db.query(func.max(Message.id)).filter(Message.channel_id == channel_id).scalar()
+        state = ReadState(user_id=user_id, channel_id=channel_id, last_read_seq=head or 0, unread_count=0)
+        db.add(state)
+        db.commit()
+    return state
+
+
+def record_message(db: Session, message: Message):
+    """
+    Write-path hook, called after the message is flushed and before commit:
+    one UPDATE bumps every other member's counter, the sender is caught up.
+    """
+    db.query(ReadState).filter(
+        ReadState.channel_id == message.channel_id,
+        ReadState.user_id != message.user_id,
+    ).update({ReadState.unread_count: ReadState.unread_count + 1}, synchronize_session=False)
+    db.query(ReadState).filter(
+        ReadState.channel_id == message.channel_id,
+        ReadState.user_id == message.user_id,
+    ).update({ReadState.last_read_seq: message.id, ReadState.unread_count: 0}, synchronize_session=False)
+
+
+def apply_ack(db: Session, user_id: int, channel_id: int, seq: int) -> ReadState:
+    """
+    Advance the read position (never backwards) and recount the unread tail.
+    seq is clamped to the channel head; raises ValueError if it is negative.
+    """
+    if seq < 0:
+        raise ValueError("seq must not be negative")
+    state = ensure_read_state(db, user_id, channel_id)
+    head = db.query(func.max(Message.id)).filter(Message.channel_id == channel_id).scalar() or 0
+    seq = min(seq, head)
+    if seq <= state.last_read_seq:
+        return state
+    state.last_read_seq = seq
+    # Bounded by the unread tail thanks to the (channel_id, id) index
+    state.unread_count = db.query(func.count(Message.id)).filter(
+        Message.channel_id == channel_id,
+        Message.id > seq,
+        Message.user_id != user_id,
+        Message.is_deleted == False,  # noqa: E712
+    ).scalar()
+    db.commit()
+    return state
+
+
+class AckCoalescer:
+    """
+    Collects WebSocket read acks and writes only the highest seq per
+    (user, channel) every ACK_FLUSH_INTERVAL, so scrolling through a channel
+    costs one write per interval instead of one per message.
+    """
+
+    def __init__(self, interval: float = ACK_FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending: Dict[Tuple[int, int], int] = {}
+        self._task = None
+
+    def ack(self, user_id: int, channel_id: int, seq: int):
+        if seq < 0:
+            return
+        key = (user_id, channel_id)
+        if seq > self.pending.get(key, 0):
+            self.pending[key] = seq
+
+    @staticmethod
+    def _write(pending: Dict[Tuple[int, int], int]):
+        """Apply acks one by one; a failing ack is logged and skipped"""
+        db = SessionLocal()
+        try:
+            for (user_id, channel_id), seq in pending.items():
+                try:
+                    apply_ack(db, user_id, channel_id, seq)
+                except Exception as e:
+                    print(f"✗ Failed to apply read ack for user {user_id} in channel {channel_id}: {e}")
+                    db.rollback()
+        finally:
+            db.close()
+
+    def flush(self):
+        """Write all pending acks from the calling thread (used at shutdown)"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        self._write(pending)
+
+    async def flush_user(self, user_id: int, channel_id: int):
+        """Write a single pending ack immediately (e.g. on disconnect)"""
+        seq = self.pending.pop((user_id, channel_id), None)
+        if seq is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, {(user_id, channel_id): seq})
+        except Exception as e:
+            print(f"✗ Failed to flush read ack on disconnect: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.pending:
+                continue
+            # Swap on the loop thread, write in the executor: ack() keeps
+            # collecting into the new dict meanwhile
+            pending, self.pending = self.pending, {}
+            try:
+                await loop.run_in_executor(None, self._write, pending)
+            except Exception as e:
+                print(f"✗ Failed to flush read acks: {e}")
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+
+ack_coalescer = AckCoalescer()
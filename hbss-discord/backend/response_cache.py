@@ -0,0 +1,80 @@
+"""
+Cache of pre-serialized JSON responses with strong ETags
+
+Read-mostly endpoints store their encoded body once; later requests are served
+from memory, and a matching If-None-Match turns into a bodiless 304. Entries are
+dropped explicitly by the write paths, with RESPONSE_CACHE_TTL as a backstop for
+changes made by other worker processes.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Response
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison (RFC 9110): W/"x" matches "x" and vice versa"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in (_opaque_tag(tag) for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Insertion order is store order, so the first entry is the oldest
+        self.entries: Dict[str, Tuple[str, bytes, float]] = {}
+
+    def lookup(self, key: str) -> Optional[Tuple[str, bytes]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl:
+            del self.entries[key]
+            return None
+        return entry[0], entry[1]
+
+    def store(self, key: str, data) -> Tuple[str, bytes]:
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.entries.pop(key, None)
+        self.entries[key] = (etag, body, time.monotonic())
+        # Bound memory for per-user keys of users who never come back
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+        return etag, body
+
+    def invalidate(self, key: str):
+        self.entries.pop(key, None)
+
+    def respond(self, key: str, if_none_match: Optional[str], build: Callable[[], object]) -> Response:
+        """
+        Serve `key` from cache, calling `build()` (DB query + serialization,
+        returning JSON-ready data) only on a miss.
+        """
+        cached = self.lookup(key)
+        if cached is None:
+            cached = self.store(key, build())
+        etag, body = cached
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation
 """
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 from typing import Optional
 
@@ -53,3 +53,50 @@ class MessageResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class ReadAck(BaseModel):
+    seq: int = Field(ge=0, le=2**63 - 1)  # SQLite INTEGER range
+
+class UnreadResponse(BaseModel):
+    channel_id: int
+    last_read_seq: int
+    unread_count: int
+    
+    class Config:
+        from_attributes = True
+
+class CheckpointResponse(BaseModel):
+    channel_id: int
+    tree_size: int
+    root: str
+    signature: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class UploadCreate(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int
+    sha256: Optional[str] = None
+    signature: Optional[str] = None  # HBSS signature JSON over sha256; requires sha256
+
+class UploadResponse(BaseModel):
+    upload_id: str
+    offset: int
+    size: int
+    attachment_id: Optional[int] = None
+
+class AttachmentResponse(BaseModel):
+    id: int
+    sha256: str
+    filename: str
+    content_type: str
+    size: int
+    uploaded_by: int
+    signature: Optional[str]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,40 @@
+"""
+Explicit warm-up for HBSS Discord workers
+
+Runs once at startup, before the worker reports ready, so the first real
+requests don't pay for opening the database, compiling the hot SQLAlchemy
+statements or importing the token libraries.
+"""
+
+import os
+import time
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from models import Channel, Message, ReadState, User
+from response_cache import response_cache
+from schemas import ChannelResponse
+
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+
+def warm_up():
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        # Populate SQLAlchemy's compiled-statement cache for the hot queries
+        channels = db.query(Channel).all()
+        response_cache.store("channels", [ChannelResponse.model_validate(c).model_dump(mode="json") for c in channels])
+        db.query(User).filter(User.id == 0).first()
+        db.query(Message).filter(Message.channel_id == 0).order_by(Message.created_at.desc()).limit(1).all()
+        db.query(ReadState).filter(ReadState.user_id == 0).all()
+    finally:
+        db.close()
+
+    import jwt  # noqa: F401  first token check would import it otherwise
+    from merkle import public_key_hex
+    public_key_hex()  # loads the checkpoint signing key and cryptography
+
+    print(f"✓ Warm-up done in {(time.perf_counter() - started) * 1000:.0f}ms")